@@ -2,28 +2,54 @@ from __future__ import annotations
 import math
 import argparse
 import csv
-import json
+import gzip
+import hashlib
 import os
+import random
 import re
+import sqlite3
+import tempfile
+import threading
 import time
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
-from typing import Any
-from urllib.parse import urlencode, urljoin
+from urllib.parse import quote_plus, urljoin, urlparse
 
+import lxml.html
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from slugify import slugify
+from urllib3.util.retry import Retry
 
 # -------------------------
 # Constants & Config
 # -------------------------
 MICHELIN_BASE = "https://guide.michelin.com"
 MICHELIN_SEOUL_LIST = "https://guide.michelin.com/us/en/seoul-capital-area/kr-seoul/restaurants"
+MICHELIN_WORKERS = 8
+MICHELIN_HTML_TTL = 7 * 24 * 3600
+
+KAKAO_WORKERS = 6
 
 BLUER_BASE = "https://bluer.co.kr"
 BLUER_API = f"{BLUER_BASE}/api/v1"
+BLUER_LIST_URL = f"{BLUER_API}/restaurants?zone1={{zone1}}&page={{page}}&size=30"
+
+# Address translator and Michelin page fallbacks
+_RE_STRIP = re.compile(r'South Korea|Seoul|,|\b\d{5}\b')
+_RE_GU = re.compile(r'([a-zA-Z]+-gu)', re.IGNORECASE)
+_RE_LEAD_DIGIT = re.compile(r'^\d')
+_RE_ROAD = re.compile(r'([a-zA-Z]+(-[a-zA-Z0-9]+)*)')
+_RE_LAT = re.compile(r'["\']?latitude["\']?\s*[:=]\s*["\']?([0-9.]+)["\']?')
+_RE_LON = re.compile(r'["\']?longitude["\']?\s*[:=]\s*["\']?([0-9.]+)["\']?')
+_RE_ADDR_SEOUL = re.compile(r"([^\n]+,\s*Seoul)")
+_RE_KAKAO_ID = re.compile(r'kakao\.com/(\d+)')
 
 DIR_RAW = Path("data/raw")
 DIR_CACHE = Path("data/cache")
@@ -33,7 +59,7 @@ DIR_SITE = Path("site")
 # -------------------------
 # Data Model
 # -------------------------
-@dataclass
+@dataclass(slots=True, kw_only=True)
 class Place:
     source: str
     name: str
@@ -57,59 +83,201 @@ class Place:
     address_ko: str | None = None  # NEW: Official Korean Address
 
 
+PLACE_FIELDS = tuple(f.name for f in fields(Place))
+# Everything except the geometry and the scrape timestamp goes into feature properties
+GEOJSON_PROPS = tuple(k for k in PLACE_FIELDS if k not in ("latitude", "longitude", "captured_at"))
+_place_row = attrgetter(*PLACE_FIELDS)
+_geojson_row = attrgetter(*GEOJSON_PROPS)
+
+
 # -------------------------
 # Caching / Ledger Logic
 # -------------------------
+@lru_cache(maxsize=8192)
+def _slug(s: str) -> str:
+    return slugify(s, lowercase=True)
+
+
 class KakaoLedger:
+    """
+    Kakao lookup cache backed by SQLite: one row per (name, address) key, so
+    updates are O(1) and `save()` only commits what changed.
+    """
+
     def __init__(self, path: Path):
         self.path = path
-        self.data: dict[str, Any] = {}
+        self.conn: sqlite3.Connection | None = None
         self.loaded = False
+        self._dirty = 0
 
     def load(self):
-        if self.path.exists():
-            try:
-                with open(self.path, "r", encoding="utf-8") as f:
-                    self.data = json.load(f)
-                print(f"[ledger] loaded {len(self.data)} entries from {self.path}")
-            except Exception as e:
-                print(f"[ledger] failed to load cache: {e}")
-                self.data = {}
+        if self.loaded: return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ledger (key TEXT PRIMARY KEY, payload BLOB)")
+        self._import_legacy_json()
+        print(f"[ledger] loaded {len(self)} entries from {self.path}")
         self.loaded = True
 
+    def _import_legacy_json(self):
+        # One-time migration from the old kakao_ledger.json
+        legacy = self.path.with_suffix(".json")
+        if not legacy.exists() or len(self): return
+        try:
+            data = orjson.loads(legacy.read_bytes())
+        except Exception as e:
+            print(f"[ledger] failed to import {legacy}: {e}")
+            return
+        self.conn.executemany("INSERT OR REPLACE INTO ledger (key, payload) VALUES (?, ?)",
+                              ((k, orjson.dumps(v)) for k, v in data.items()))
+        self.conn.commit()
+        print(f"[ledger] imported {len(data)} entries from {legacy}")
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM ledger").fetchone()[0]
+
     def save(self):
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
-        print(f"[ledger] saved {len(self.data)} entries to {self.path}")
+        if not self.loaded: return
+        self.conn.commit()
+        self._dirty = 0
+        print(f"[ledger] saved {len(self)} entries to {self.path}")
+
+    def autosave(self, every: int = 200):
+        # Periodic commit so a crash mid-run keeps most of the lookups
+        if self._dirty >= every: self.save()
 
     def get_key(self, name: str, address: str | None) -> str:
-        n = slugify(name or "unknown", lowercase=True)
-        a = slugify(address or "", lowercase=True)
-        return f"{n}__{a}"
+        return f"{_slug(name or 'unknown')}__{_slug(address or '')}"
 
     def get(self, name: str, address: str | None) -> dict | None:
         if not self.loaded: self.load()
-        return self.data.get(self.get_key(name, address))
+        row = self.conn.execute("SELECT payload FROM ledger WHERE key = ?", (self.get_key(name, address),)).fetchone()
+        return orjson.loads(row[0]) if row else None
 
     def update(self, name: str, address: str | None, result: dict | None):
         if not self.loaded: self.load()
         key = self.get_key(name, address)
-        self.data[key] = result
+        payload = orjson.dumps(result)
+        row = self.conn.execute("SELECT payload FROM ledger WHERE key = ?", (key,)).fetchone()
+        if row and row[0] == payload: return
+        self.conn.execute("INSERT OR REPLACE INTO ledger (key, payload) VALUES (?, ?)", (key, payload))
+        self._dirty += 1
+
+
+# -------------------------
+# Rate Control
+# -------------------------
+class AimdController:
+    """
+    Additive-increase / multiplicative-decrease pacer.
+    `c` is the allowed request rate (req/s): healthy responses nudge it up by
+    `alpha`, 429/5xx responses cut it by `beta` and push the next slot back.
+    """
+
+    def __init__(self, c: float = 2.0, alpha: float = 0.5, beta: float = 0.5,
+                 c_min: float = 1.0, c_max: float = 16.0):
+        self.c = c
+        self.alpha = alpha
+        self.beta = beta
+        self.c_min = c_min
+        self.c_max = c_max
+        self._next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        # Reserve the next slot under the lock, sleep outside it
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + 1.0 / self.c
+        if start > now: time.sleep(start - now)
+
+    def on_success(self):
+        with self.lock:
+            self.c = min(self.c_max, self.c + self.alpha)
+
+    def on_congestion(self, cool_off: float = 0.0):
+        with self.lock:
+            self.c = max(self.c_min, self.c * self.beta)
+            self._next_at = max(self._next_at, time.monotonic() + cool_off)
+
+
+class TokenBucket:
+    """Blocking token bucket: refills `rate` tokens/s and holds at most `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Waiters sleep while holding the lock, so concurrent callers queue up in turn
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            self.tokens = 0.0
+            self.updated = now + wait
+
+
+# One bucket per host, shared by every call site that talks to it
+HOST_LIMITERS = {
+    "guide.michelin.com": TokenBucket(rate=4),
+    "bluer.co.kr": TokenBucket(rate=5),
+    "dapi.kakao.com": TokenBucket(rate=10),
+}
+
+
+def throttle(url: str):
+    limiter = HOST_LIMITERS.get(urlparse(url).hostname or "")
+    if limiter: limiter.acquire()
+
+
+# Capped at the host bucket's rate: above it the bucket, not AIMD, sets the pace and a 429 halving would
+# still leave c over the real rate, so traffic would never actually slow down
+BLUER_AIMD = AimdController(c_max=HOST_LIMITERS["bluer.co.kr"].rate)
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 120.0
+
+
+def retry_after_seconds(r: requests.Response) -> float | None:
+    """Reads Retry-After as either delta-seconds or an HTTP-date."""
+    value = r.headers.get("Retry-After")
+    if not value: return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None: when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
 
 
 # -------------------------
 # Address Translator
 # -------------------------
+@lru_cache(maxsize=4096)
 def generate_korean_query(address: str) -> str | None:
     if not address: return None
-    clean = re.sub(r'South Korea|Seoul|,|\b\d{5}\b', ' ', address).strip()
-    gu_match = re.search(r'([a-zA-Z]+-gu)', clean, re.IGNORECASE)
+    clean = _RE_STRIP.sub(' ', address).strip()
+    gu_match = _RE_GU.search(clean)
     if not gu_match: return f"Seoul {clean}"
     gu = gu_match.group(1)
     rest = clean.replace(gu, "").strip()
-    if re.match(r'^\d', rest):
-        road_match = re.search(r'([a-zA-Z]+(-[a-zA-Z0-9]+)*)', rest)
+    if _RE_LEAD_DIGIT.match(rest):
+        road_match = _RE_ROAD.search(rest)
         if road_match:
             road_start = road_match.start()
             number = rest[:road_start].strip()
@@ -125,14 +293,24 @@ def kakao_rest_key() -> str | None:
     return os.getenv("KAKAO_REST_API_KEY")
 
 
-def kakao_address_search(s: requests.Session, api_key: str, address: str) -> dict | None:
+def make_kakao_session(api_key: str) -> requests.Session:
+    s = requests.Session()
+    s.headers.update({"Authorization": f"KakaoAK {api_key}"})
+    # Only back off when Kakao pushes back; honour its Retry-After on 429s
+    retry = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+    return s
+
+
+def kakao_address_search(s: requests.Session, address: str) -> dict | None:
     url = "https://dapi.kakao.com/v2/local/search/address.json"
-    headers = {"Authorization": f"KakaoAK {api_key}"}
     q = generate_korean_query(address)
     if not q: return None
     try:
         params = {"query": q, "analyze_type": "similar"}
-        r = s.get(url, params=params, headers=headers, timeout=5)
+        throttle(url)
+        r = s.get(url, params=params, timeout=5)
         r.raise_for_status()
         docs = r.json().get("documents", [])
         if docs:
@@ -142,15 +320,15 @@ def kakao_address_search(s: requests.Session, api_key: str, address: str) -> dic
     return None
 
 
-def kakao_local_keyword_search(s: requests.Session, api_key: str, query: str, x: float | None, y: float | None,
+def kakao_local_keyword_search(s: requests.Session, query: str, x: float | None, y: float | None,
                                radius: int = 2000) -> list[dict]:
     url = "https://dapi.kakao.com/v2/local/search/keyword.json"
     params = {"query": query[:80], "size": 3, "category_group_code": "FD6"}
     if x and y:
         params.update({"x": str(x), "y": str(y), "radius": str(radius), "sort": "distance"})
-    headers = {"Authorization": f"KakaoAK {api_key}"}
     try:
-        r = s.get(url, params=params, headers=headers, timeout=10)
+        throttle(url)
+        r = s.get(url, params=params, timeout=10)
         if r.status_code == 400: return []
         r.raise_for_status()
         return r.json().get("documents", [])
@@ -158,24 +336,85 @@ def kakao_local_keyword_search(s: requests.Session, api_key: str, query: str, x:
         return []
 
 
+def resolve_kakao(s: requests.Session, p: Place) -> dict:
+    """
+    Looks up one uncached place on Kakao, filling its id/url/coords in place.
+    Returns the entry to record in the ledger; safe to run on a worker thread.
+    """
+    has_coords = isinstance(p.latitude, float) and isinstance(p.longitude, float)
+    found_doc = None
+
+    # PRIORITY: Try searching with the Official Korean Name if we found it
+    # (Neon rows carry the same string in both; don't search it twice)
+    search_terms = []
+    if p.name_ko and p.name_ko != p.name: search_terms.append(p.name_ko)
+    search_terms.append(p.name)
+
+    if has_coords:
+        for term in search_terms:
+            docs = kakao_local_keyword_search(s, term, p.longitude, p.latitude, radius=500)
+            if docs: found_doc = docs[0]; break
+        if not found_doc: found_doc = {"id": None, "place_url": None, "x": str(p.longitude), "y": str(p.latitude)}
+
+    elif p.address:
+        # Try searching address using Korean Address if available
+        addr_to_use = p.address_ko if p.address_ko else p.address
+        # If it's Korean, address search works better without my English-flipper logic
+        # But the existing logic handles English well. Let's try English address first.
+        coords = kakao_address_search(s, p.address)
+        if coords:
+            lat, lon = float(coords["y"]), float(coords["x"])
+            for term in search_terms:
+                docs = kakao_local_keyword_search(s, term, lon, lat, radius=100)
+                if docs: found_doc = docs[0]; break
+            if not found_doc: found_doc = {"id": None, "place_url": None, "x": coords["x"], "y": coords["y"]}
+
+    if not found_doc and not has_coords:
+        if p.source == "michelin":
+            return {"found": False}
+
+        # Fallback for Blue Ribbon
+        candidates = [p.name]
+        if p.korean_query: candidates.append(p.korean_query)
+        for q in candidates:
+            if not q: continue
+            docs = kakao_local_keyword_search(s, q, None, None)
+            if docs: found_doc = docs[0]; break
+
+    if found_doc:
+        if has_coords:
+            dist = haversine_distance(p.latitude, p.longitude, float(found_doc["y"]), float(found_doc["x"]))
+            if dist > 2000:
+                print(f"[sanity] Rejecting API result for {p.name} (Distance {dist:.0f}m)")
+                return {"found": True, "x": str(p.longitude), "y": str(p.latitude), "id": None, "place_url": None}
+
+        p.kakao_id = found_doc.get("id")
+        p.kakao_url = found_doc.get("place_url")
+        if not has_coords:
+            if found_doc.get("y"): p.latitude = float(found_doc["y"])
+            if found_doc.get("x"): p.longitude = float(found_doc["x"])
+        return found_doc
+
+    if not has_coords: return {"found": False}
+    return {"found": True, "x": str(p.longitude), "y": str(p.latitude), "id": None, "place_url": None}
+
+
 def enrich_places_with_ledger(places: list[Place], ledger: KakaoLedger) -> list[Place]:
     api_key = kakao_rest_key()
     if not api_key:
         print("[kakao] NO API KEY FOUND. Skipping enrichment.")
         return places
 
-    s = requests.Session()
+    s = make_kakao_session(api_key)
     ledger.load()
 
-    hits, misses, api_calls = 0, 0, 0
-    out: list[Place] = []
+    uncached: list[Place] = []
 
     for p in places:
         has_coords = isinstance(p.latitude, float) and isinstance(p.longitude, float)
         cached = ledger.get(p.name, p.address)
 
         if cached and cached.get("found") is not False:
-            hits += 1
             if has_coords and cached.get("y") and cached.get("x"):
                 dist = haversine_distance(p.latitude, p.longitude, float(cached["y"]), float(cached["x"]))
                 if dist > 2000:
@@ -190,79 +429,20 @@ def enrich_places_with_ledger(places: list[Place], ledger: KakaoLedger) -> list[
                 p.kakao_url = cached.get("place_url")
                 if not has_coords and cached.get("y"): p.latitude = float(cached["y"])
                 if not has_coords and cached.get("x"): p.longitude = float(cached["x"])
-            out.append(p)
-            continue
-
-        api_calls += 1
-        misses += 1
-        found_doc = None
-
-        # PRIORITY: Try searching with the Official Korean Name if we found it
-        search_terms = []
-        if p.name_ko: search_terms.append(p.name_ko)
-        search_terms.append(p.name)
-
-        if has_coords:
-            for term in search_terms:
-                docs = kakao_local_keyword_search(s, api_key, term, p.longitude, p.latitude, radius=500)
-                if docs: found_doc = docs[0]; break
-            if not found_doc: found_doc = {"id": None, "place_url": None, "x": str(p.longitude), "y": str(p.latitude)}
-
-        elif p.address:
-            # Try searching address using Korean Address if available
-            addr_to_use = p.address_ko if p.address_ko else p.address
-            # If it's Korean, address search works better without my English-flipper logic
-            # But the existing logic handles English well. Let's try English address first.
-            coords = kakao_address_search(s, api_key, p.address)
-            if coords:
-                lat, lon = float(coords["y"]), float(coords["x"])
-                for term in search_terms:
-                    docs = kakao_local_keyword_search(s, api_key, term, lon, lat, radius=100)
-                    if docs: found_doc = docs[0]; break
-                if not found_doc: found_doc = {"id": None, "place_url": None, "x": coords["x"], "y": coords["y"]}
-
-        if not found_doc and not has_coords:
-            if p.source == "michelin":
-                ledger.update(p.name, p.address, {"found": False})
-                out.append(p)
-                continue
-
-            # Fallback for Blue Ribbon
-            candidates = [p.name]
-            if p.address: candidates.append(generate_korean_query(p.address))
-            for q in candidates:
-                if not q: continue
-                docs = kakao_local_keyword_search(s, api_key, q, None, None)
-                if docs: found_doc = docs[0]; break
-                time.sleep(0.1)
-
-        if found_doc:
-            if has_coords:
-                dist = haversine_distance(p.latitude, p.longitude, float(found_doc["y"]), float(found_doc["x"]))
-                if dist > 2000:
-                    print(f"[sanity] Rejecting API result for {p.name} (Distance {dist:.0f}m)")
-                    ledger.update(p.name, p.address,
-                                  {"found": True, "x": str(p.longitude), "y": str(p.latitude), "id": None,
-                                   "place_url": None})
-                    out.append(p)
-                    continue
-
-            ledger.update(p.name, p.address, found_doc)
-            p.kakao_id = found_doc.get("id")
-            p.kakao_url = found_doc.get("place_url")
-            if not has_coords:
-                if found_doc.get("y"): p.latitude = float(found_doc["y"])
-                if found_doc.get("x"): p.longitude = float(found_doc["x"])
         else:
-            ledger.update(p.name, p.address,
-                          {"found": False} if not has_coords else {"found": True, "x": str(p.longitude),
-                                                                   "y": str(p.latitude), "id": None, "place_url": None})
+            uncached.append(p)
+
+    print(f"[kakao] {len(places) - len(uncached)} ledger hits, {len(uncached)} to look up")
 
-        out.append(p)
-        if api_calls % 10 == 0: time.sleep(0.5)
+    # Lookups overlap on a small pool (the dapi.kakao.com bucket caps the rate);
+    # ledger writes stay on this thread.
+    with ThreadPoolExecutor(max_workers=KAKAO_WORKERS) as ex:
+        for p, entry in zip(uncached, ex.map(lambda p: resolve_kakao(s, p), uncached)):
+            ledger.update(p.name, p.address, entry)
+            ledger.autosave()
 
     ledger.save()
-    return out
+    return places
 
 
 # -------------------------
@@ -275,6 +455,8 @@ def utc_now_iso() -> str:
 def make_session_michelin() -> requests.Session:
     s = requests.Session()
     s.headers.update({"User-Agent": "Mozilla/5.0", "Accept-Language": "en-US,en;q=0.9"})
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    s.mount("https://", HTTPAdapter(pool_connections=MICHELIN_WORKERS, pool_maxsize=MICHELIN_WORKERS, max_retries=retry))
     return s
 
 
@@ -284,13 +466,176 @@ def make_session_bluer() -> requests.Session:
     return s
 
 
+def fetch_cached(s: requests.Session, url: str, timeout: int = 20, ttl: float = MICHELIN_HTML_TTL) -> str:
+    """GETs a page through a gzip'd on-disk cache keyed by URL; fresh copies skip the network."""
+    path = DIR_CACHE / "michelin_html" / f"{hashlib.sha1(url.encode()).hexdigest()}.html.gz"
+    if path.exists() and time.time() - path.stat().st_mtime < ttl:
+        try:
+            return gzip.decompress(path.read_bytes()).decode("utf-8")
+        except (gzip.BadGzipFile, EOFError, UnicodeDecodeError):
+            path.unlink(missing_ok=True)  # truncated/corrupt entry: treat as a miss and refetch
+    throttle(url)
+    r = s.get(url, timeout=timeout)
+    r.raise_for_status()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write beside the target and rename, so a killed run never leaves a half-written entry
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(r.text.encode("utf-8")))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return r.text
+
+
+def node_text(el) -> str:
+    """Concatenates an element's stripped text pieces (BeautifulSoup's get_text(strip=True))."""
+    return "".join(t.strip() for t in el.itertext())
+
+
+def first_by_class(tree, cls: str):
+    hits = tree.xpath(f'//*[contains(concat(" ", normalize-space(@class), " "), " {cls} ")]')
+    return hits[0] if hits else None
+
+
+def body_text(tree) -> str:
+    """Visible <body> text, skipping script/style contents like BeautifulSoup's get_text()."""
+    return "".join(tree.xpath("//body//text()[not(ancestor::script or ancestor::style)]"))
+
+
+def michelin_award(text: str) -> str | None:
+    """Maps award wording ("3 stars", "bib gourmand", ...) to a category, or None if there is none."""
+    text_lower = text.lower()
+    if "3 stars" in text_lower:
+        return "3 Stars"
+    elif "2 stars" in text_lower:
+        return "2 Stars"
+    elif "1 star" in text_lower:
+        return "1 Star"
+    elif "bib gourmand" in text_lower:
+        return "Bib Gourmand"
+    return None
+
+
+def fetch_michelin_detail(s: requests.Session, u: str, captured_at: str, i: int, total: int) -> Place | None:
+    """Fetches one Michelin detail page (English + Korean) and builds its Place."""
+    try:
+        # A. Fetch English
+        html_text = fetch_cached(s, u, timeout=20)
+        tree = lxml.html.fromstring(html_text)
+        h1 = tree.find(".//h1")
+        name = node_text(h1) if h1 is not None else "Unknown"
+
+        # Description etc
+        desc_div = first_by_class(tree, "data-sheet__description")
+        description = node_text(desc_div) if desc_div is not None else None
+
+        price_cuisine_text = first_by_class(tree, "data-sheet__block--text")
+        pc_text = node_text(price_cuisine_text) if price_cuisine_text is not None else ""
+        price, cuisine = None, None
+        if "·" in pc_text:
+            parts = pc_text.split("·")
+            price = parts[0].strip()
+            cuisine = parts[1].strip()
+        else:
+            cuisine = pc_text
+
+        # Geo
+        lat, lon, address = None, None, None
+        scripts = tree.xpath('//script[@type="application/ld+json"]/text()', smart_strings=False)
+        # The Restaurant block carries both address and geo; try it before breadcrumbs etc.
+        scripts.sort(key=lambda sc: "Restaurant" not in sc and "FoodEstablishment" not in sc)
+        for sc in scripts:
+            if address and lat is not None and lon is not None: break
+            # Only address-bearing or Restaurant blocks can contribute; skip parsing the rest
+            if "address" not in sc and "Restaurant" not in sc and "FoodEstablishment" not in sc: continue
+            try:
+                data = orjson.loads(sc)
+                if not isinstance(data, list): data = [data]
+                for item in data:
+                    if not address and item.get("address"):
+                        addr_obj = item.get("address")
+                        if isinstance(addr_obj, dict):
+                            address = f"{addr_obj.get('streetAddress', '')}, {addr_obj.get('addressLocality', '')}"
+                    if item.get("@type") in ("Restaurant", "FoodEstablishment"):
+                        geo = item.get("geo", {})
+                        if geo.get("latitude"): lat = float(geo.get("latitude"))
+                        if geo.get("longitude"): lon = float(geo.get("longitude"))
+            except:
+                pass
+
+        if lat is None:
+            lat_match = _RE_LAT.search(html_text)
+            if lat_match: lat = float(lat_match.group(1))
+        if lon is None:
+            lon_match = _RE_LON.search(html_text)
+            if lon_match: lon = float(lon_match.group(1))
+
+        body = None  # visible text, extracted at most once per page
+        if not address:
+            body = body_text(tree)
+            m = _RE_ADDR_SEOUL.search(body)
+            if m: address = m.group(1).strip()
+
+        # B. THE DOUBLE DIP: Fetch Korean Version
+        name_ko, address_ko = None, None
+        try:
+            # Replace /us/en/ with /kr/ko/
+            url_ko = u.replace("/us/en/", "/kr/ko/")
+            html_ko = fetch_cached(s, url_ko, timeout=10)
+            if html_ko:
+                tree_ko = lxml.html.fromstring(html_ko)
+                # Scrape Korean Name
+                h1_ko = tree_ko.find(".//h1")
+                if h1_ko is not None: name_ko = node_text(h1_ko)
+
+                # Scrape Korean Address (from LD-JSON or body)
+                scripts_ko = tree_ko.xpath('//script[@type="application/ld+json"]/text()', smart_strings=False)
+                # Michelin emits the Restaurant block last
+                for sc in reversed(scripts_ko):
+                    if address_ko: break
+                    if "address" not in sc: continue
+                    try:
+                        d_ko = orjson.loads(sc)
+                        if not isinstance(d_ko, list): d_ko = [d_ko]
+                        for it in d_ko:
+                            if it.get("address"):
+                                ao = it.get("address")
+                                if isinstance(ao, dict):
+                                    address_ko = f"{ao.get('streetAddress', '')}, {ao.get('addressLocality', '')}"
+                    except:
+                        pass
+        except Exception as e:
+            print(f"    [ko-fetch] failed: {e}")
+
+        # Categories: read the award badge; scan the whole body if there is no badge or it names no award
+        badge = first_by_class(tree, "data-sheet__classification")
+        category = michelin_award(badge.text_content()) if badge is not None else None
+        if category is None:
+            category = michelin_award(body if body is not None else body_text(tree)) or "Selected"
+
+        place = Place(
+            source="michelin", name=name, address=address, city="Seoul", country="South Korea",
+            category=category, cuisine=cuisine, price=price, phone=None, url=u, year=None,
+            description=description, latitude=lat, longitude=lon, captured_at=captured_at,
+            name_ko=name_ko, address_ko=address_ko  # Save Korean info
+        )
+        print(f"  [{i + 1}/{total}] {name} -> {name_ko if name_ko else 'No Korean Name'}")
+        return place
+
+    except Exception as e:
+        print(f"  [{i + 1}] Failed {u}: {e}")
+        return None
+
+
 def scrape_michelin_run(limit: int = 0) -> list[Place]:
     print("[michelin] Starting scrape...")
     s = make_session_michelin()
     captured_at = utc_now_iso()
-    places = []
     page = 1
-    detail_urls = set()
+    detail_urls: dict[str, None] = {}  # insertion-ordered set: listing order is kept
 
     # 1. Gather URLs
     while True:
@@ -300,131 +645,114 @@ def scrape_michelin_run(limit: int = 0) -> list[Place]:
             r = s.get(url, timeout=20)
             if r.status_code == 404: break
             r.raise_for_status()
-            soup = BeautifulSoup(r.text, "lxml")
-            links = soup.select("a[href*='/restaurant/']")
-            if not links: break
-            new_found = 0
-            for link in links:
-                full = urljoin(MICHELIN_BASE, link['href'])
-                if full not in detail_urls:
-                    detail_urls.add(full)
-                    new_found += 1
-            if new_found == 0: break
+            hrefs = lxml.html.fromstring(r.text).xpath("//a[contains(@href, '/restaurant/')]/@href")
+            if not hrefs: break
+            prev_len = len(detail_urls)
+            for href in hrefs:
+                detail_urls.setdefault(urljoin(MICHELIN_BASE, href), None)
+            if len(detail_urls) == prev_len: break
             page += 1
             time.sleep(1)
         except Exception as e:
             print(f"[michelin] list error: {e}")
             break
 
-    sorted_urls = sorted(list(detail_urls))
-    if limit: sorted_urls = sorted_urls[:limit]
-    print(f"[michelin] found {len(sorted_urls)} details. Fetching...")
+    urls = list(detail_urls)
+    if limit: urls = urls[:limit]
+    print(f"[michelin] found {len(urls)} details. Fetching...")
+
+    # 2. Fetch Details (English + Korean) concurrently; the host bucket keeps the aggregate rate polite
+    total = len(urls)
+    with ThreadPoolExecutor(max_workers=MICHELIN_WORKERS) as ex:
+        futures = [ex.submit(fetch_michelin_detail, s, u, captured_at, i, total) for i, u in enumerate(urls)]
+        return [p for p in (f.result() for f in futures) if p is not None]
+
+
+def bluer_get_json(s: requests.Session, url: str, max_retries: int = 6) -> dict:
+    prev_sleep = BACKOFF_BASE
+    for attempt in range(max_retries):
+        BLUER_AIMD.wait()
+        throttle(url)
+        r = s.get(url, timeout=20)
+        if r.status_code == 429 or r.status_code >= 500:
+            # Decorrelated jitter keeps concurrent clients from retrying in lockstep
+            wait = retry_after_seconds(r)
+            if wait is None: wait = min(BACKOFF_CAP, random.uniform(BACKOFF_BASE, prev_sleep * 3))
+            prev_sleep = max(wait, BACKOFF_BASE)
+            BLUER_AIMD.on_congestion(cool_off=wait)
+            print(f"  [bluer] HTTP {r.status_code}, backing off {wait:.1f}s (rate now {BLUER_AIMD.c:.1f}/s)")
+            continue
+        r.raise_for_status()
+        BLUER_AIMD.on_success()
+        data = orjson.loads(r.content)
+        return data if isinstance(data, dict) else {}
+    raise requests.HTTPError(f"gave up on {url} after {max_retries} attempts")
 
-    # 2. Fetch Details (English + Korean)
-    for i, u in enumerate(sorted_urls):
-        try:
-            time.sleep(0.5)
-            # A. Fetch English
-            r = s.get(u, timeout=20)
-            soup = BeautifulSoup(r.text, "lxml")
-            name = soup.find("h1").get_text(strip=True) if soup.find("h1") else "Unknown"
-
-            # Description etc
-            desc_div = soup.select_one(".data-sheet__description")
-            description = desc_div.get_text(strip=True) if desc_div else None
-
-            price_cuisine_text = soup.select_one(".data-sheet__block--text")
-            pc_text = price_cuisine_text.get_text(strip=True) if price_cuisine_text else ""
-            price, cuisine = None, None
-            if "·" in pc_text:
-                parts = pc_text.split("·")
-                price = parts[0].strip()
-                cuisine = parts[1].strip()
-            else:
-                cuisine = pc_text
-
-            # Geo
-            lat, lon, address = None, None, None
-            scripts = soup.find_all("script", {"type": "application/ld+json"})
-            for sc in scripts:
-                try:
-                    data = json.loads(sc.string)
-                    if not isinstance(data, list): data = [data]
-                    for item in data:
-                        if not address and item.get("address"):
-                            addr_obj = item.get("address")
-                            if isinstance(addr_obj, dict):
-                                address = f"{addr_obj.get('streetAddress', '')}, {addr_obj.get('addressLocality', '')}"
-                        if item.get("@type") in ("Restaurant", "FoodEstablishment"):
-                            geo = item.get("geo", {})
-                            if geo.get("latitude"): lat = float(geo.get("latitude"))
-                            if geo.get("longitude"): lon = float(geo.get("longitude"))
-                except:
-                    pass
-
-            if lat is None:
-                lat_match = re.search(r'["\']?latitude["\']?\s*[:=]\s*["\']?([0-9.]+)["\']?', str(soup))
-                if lat_match: lat = float(lat_match.group(1))
-            if lon is None:
-                lon_match = re.search(r'["\']?longitude["\']?\s*[:=]\s*["\']?([0-9.]+)["\']?', str(soup))
-                if lon_match: lon = float(lon_match.group(1))
-
-            if not address:
-                m = re.search(r"([^\n]+,\s*Seoul)", soup.body.get_text())
-                if m: address = m.group(1).strip()
-
-            # B. THE DOUBLE DIP: Fetch Korean Version
-            name_ko, address_ko = None, None
-            try:
-                # Replace /us/en/ with /kr/ko/
-                url_ko = u.replace("/us/en/", "/kr/ko/")
-                r_ko = s.get(url_ko, timeout=10)
-                if r_ko.status_code == 200:
-                    soup_ko = BeautifulSoup(r_ko.text, "lxml")
-                    # Scrape Korean Name
-                    h1_ko = soup_ko.find("h1")
-                    if h1_ko: name_ko = h1_ko.get_text(strip=True)
-
-                    # Scrape Korean Address (from LD-JSON or body)
-                    scripts_ko = soup_ko.find_all("script", {"type": "application/ld+json"})
-                    for sc in scripts_ko:
-                        try:
-                            d_ko = json.loads(sc.string)
-                            if not isinstance(d_ko, list): d_ko = [d_ko]
-                            for it in d_ko:
-                                if it.get("address"):
-                                    ao = it.get("address")
-                                    if isinstance(ao, dict):
-                                        address_ko = f"{ao.get('streetAddress', '')}, {ao.get('addressLocality', '')}"
-                        except:
-                            pass
-            except Exception as e:
-                print(f"    [ko-fetch] failed: {e}")
-
-            # Categories
-            category = "Selected"
-            text_lower = soup.body.get_text().lower()
-            if "3 stars" in text_lower:
-                category = "3 Stars"
-            elif "2 stars" in text_lower:
-                category = "2 Stars"
-            elif "1 star" in text_lower:
-                category = "1 Star"
-            elif "bib gourmand" in text_lower:
-                category = "Bib Gourmand"
 
-            p = Place(
-                source="michelin", name=name, address=address, city="Seoul", country="South Korea",
-                category=category, cuisine=cuisine, price=price, phone=None, url=u, year=None,
-                description=description, latitude=lat, longitude=lon, captured_at=captured_at,
-                name_ko=name_ko, address_ko=address_ko  # Save Korean info
-            )
-            places.append(p)
-            print(f"  [{i + 1}/{len(sorted_urls)}] {name} -> {name_ko if name_ko else 'No Korean Name'}")
+def hal_extract_items(data: dict) -> list[dict]:
+    """Returns every item listed under HAL `_embedded` (all list-valued keys, in order)."""
+    items = []
+    for v in (data.get("_embedded") or {}).values():
+        if isinstance(v, list): items.extend(v)
+    return items
+
+
+BLUER_RIBBONS = ("RIBBON_ONE", "RIBBON_TWO", "RIBBON_THREE")
+
+
+def is_blueribbon_winner(item: dict) -> bool:
+    header = item.get("headerInfo") or {}
+    return (header.get("ribbonType") or "").upper() in BLUER_RIBBONS
+
+
+def bluer_item_to_place(item: dict, captured_at: str) -> Place:
+    header = item.get("headerInfo") or {}
+    juso = item.get("juso") or {}
+    gps = item.get("gps") or {}
+    description = item.get("comment") or header.get("nameEN")
+
+    # Blue Ribbon has native Korean name already
+    name_kr = header.get("nameKR")
+    name_en = header.get("nameEN") or name_kr
+
+    return Place(
+        source="blueribbon", name=name_en,
+        address=juso.get("roadAddrPart1"), city="Seoul", country="South Korea",
+        category=(header.get("ribbonType") or "").upper(), cuisine=None, price=None,
+        phone=item.get("defaultInfo", {}).get("phone"),
+        url=None, year=header.get("bookYear"), description=description,
+        latitude=float(gps["latitude"]) if gps.get("latitude") else None,
+        longitude=float(gps["longitude"]) if gps.get("longitude") else None,
+        captured_at=captured_at,
+        name_ko=name_kr,  # Map nameKR -> name_ko
+        address_ko=juso.get("roadAddrPart1")
+    )
 
-        except Exception as e:
-            print(f"  [{i + 1}] Failed {u}: {e}")
 
+def scrape_bluer_zone(s: requests.Session, zone: str, captured_at: str) -> list[Place]:
+    print(f"[bluer] probing zone: {zone}")
+    places = []
+    zone1 = quote_plus(zone)
+    page = 1
+    consecutive_empty = 0
+    while True:
+        try:
+            url = BLUER_LIST_URL.format(zone1=zone1, page=page)
+            data = bluer_get_json(s, url)
+            items = hal_extract_items(data)
+            if not items: break
+            page_places = [bluer_item_to_place(item, captured_at) for item in items if is_blueribbon_winner(item)]
+            found_on_page = len(page_places)
+            places.extend(page_places)
+            if found_on_page == 0:
+                consecutive_empty += 1
+            else:
+                consecutive_empty = 0
+            if consecutive_empty >= 5: print(f"  [bluer] 5 empty pages in {zone}. Done."); break
+            if "next" not in data.get("_links", {}): break
+            page += 1
+        except Exception as e:
+            print(f"[bluer] error in {zone}: {e}"); break
     return places
 
 
@@ -432,73 +760,21 @@ def scrape_bluer_run() -> list[Place]:
     print("[bluer] Starting scrape...")
     s = make_session_bluer()
     captured_at = utc_now_iso()
-    places = []
     zones = ["서울 강북", "서울 강남"]
-    for zone in zones:
-        print(f"[bluer] probing zone: {zone}")
-        params = {"zone1": zone, "page": 1, "size": 30}
-        consecutive_empty = 0
-        while True:
-            try:
-                url = f"{BLUER_API}/restaurants?{urlencode(params)}"
-                r = s.get(url, timeout=20)
-                if r.status_code == 429: time.sleep(5); continue
-                r.raise_for_status()
-                data = r.json()
-                embedded = data.get("_embedded", {})
-                items = []
-                for k, v in embedded.items():
-                    if isinstance(v, list): items.extend(v)
-                if not items: break
-                found_on_page = 0
-                for item in items:
-                    header = item.get("headerInfo") or {}
-                    ribbon = (header.get("ribbonType") or "").upper()
-                    if ribbon in ["RIBBON_ONE", "RIBBON_TWO", "RIBBON_THREE"]:
-                        found_on_page += 1
-                        juso = item.get("juso") or {}
-                        gps = item.get("gps") or {}
-                        description = item.get("comment") or header.get("nameEN")
-
-                        # Blue Ribbon has native Korean name already
-                        name_kr = header.get("nameKR")
-                        name_en = header.get("nameEN") or name_kr
-
-                        p = Place(
-                            source="blueribbon", name=name_en,
-                            address=juso.get("roadAddrPart1"), city="Seoul", country="South Korea",
-                            category=ribbon, cuisine=None, price=None, phone=item.get("defaultInfo", {}).get("phone"),
-                            url=None, year=header.get("bookYear"), description=description,
-                            latitude=float(gps["latitude"]) if gps.get("latitude") else None,
-                            longitude=float(gps["longitude"]) if gps.get("longitude") else None,
-                            captured_at=captured_at,
-                            name_ko=name_kr,  # Map nameKR -> name_ko
-                            address_ko=juso.get("roadAddrPart1")
-                        )
-                        places.append(p)
-                if found_on_page == 0:
-                    consecutive_empty += 1
-                else:
-                    consecutive_empty = 0
-                if consecutive_empty >= 5: print(f"  [bluer] 5 empty pages. Next zone."); break
-                if "next" not in data.get("_links", {}): break
-                params["page"] += 1
-                time.sleep(0.5)
-            except Exception as e:
-                print(f"[bluer] error: {e}"); break
-        save_raw(places, "blueribbon.csv")
-    return places
+    # Zones page independently; the shared AIMD pacer and host bucket bound the combined rate
+    with ThreadPoolExecutor(max_workers=len(zones)) as ex:
+        per_zone = list(ex.map(lambda zone: scrape_bluer_zone(s, zone, captured_at), zones))
+    return [p for places in per_zone for p in places]
 
 
 def save_raw(places: list[Place], filename: str):
     path = DIR_RAW / filename
     path.parent.mkdir(parents=True, exist_ok=True)
     if not places: return
-    keys = asdict(places[0]).keys()
     with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=keys)
-        w.writeheader()
-        for p in places: w.writerow(asdict(p))
+        w = csv.writer(f)
+        w.writerow(PLACE_FIELDS)
+        w.writerows(map(_place_row, places))
     print(f"[io] saved {len(places)} to {path}")
 
 
@@ -522,6 +798,9 @@ def load_raw(filename: str) -> list[Place]:
                 del row['description_ko']
             # ----------------------
 
+            # Derive the Kakao query once per row; enrichment reuses it
+            row["korean_query"] = row.get("korean_query") or generate_korean_query(row.get("address"))
+
             out.append(Place(**row))
     return out
 
@@ -570,7 +849,7 @@ def load_neon_guide(filename: str) -> list[Place]:
             kakao_url = row.get("Kakao URL")
             kakao_id = None
             if kakao_url:
-                m = re.search(r'kakao\.com/(\d+)', kakao_url)
+                m = _RE_KAKAO_ID.search(kakao_url)
                 if m: kakao_id = m.group(1)
 
             desc_en = row.get("Description EN", "")
@@ -597,21 +876,27 @@ def load_neon_guide(filename: str) -> list[Place]:
 def write_geojson(places: list[Place]):
     DIR_SITE.mkdir(exist_ok=True)
     path = DIR_SITE / "places.geojson"
-    features = []
-    for p in places:
-        if not p.latitude or not p.longitude: continue
-        props = asdict(p)
-        del props["latitude"]
-        del props["longitude"]
-        del props["captured_at"]
-        features.append({
-            "type": "Feature",
-            "geometry": {"type": "Point", "coordinates": [p.longitude, p.latitude]},
-            "properties": props
-        })
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False, indent=2)
-    print(f"[io] wrote {len(features)} features to {path}")
+    count = 0
+    # Stream feature by feature, laid out exactly like json.dump(indent=2) so the file stays diffable
+    with open(path, "wb") as f:
+        f.write(b'{\n  "type": "FeatureCollection",\n  "features": [')
+        for place in places:
+            if not place.latitude or not place.longitude: continue
+            feature = orjson.dumps({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [place.longitude, place.latitude]},
+                "properties": dict(zip(GEOJSON_PROPS, _geojson_row(place)))
+            }, option=orjson.OPT_INDENT_2)
+            f.write(b",\n    " if count else b"\n    ")
+            f.write(feature.replace(b"\n", b"\n    "))
+            count += 1
+        f.write(b"\n  ]\n}" if count else b"]\n}")
+    print(f"[io] wrote {count} features to {path}")
+
+
+def canon_key(name: str, address: str | None) -> str:
+    """Dedupe key: the slug of name + address (accents/Hangul transliterated, so sources agree)."""
+    return _slug(f"{name} {address or ''}")
 
 
 def haversine_distance(lat1, lon1, lat2, lon2):
@@ -645,16 +930,14 @@ def main():
         else:
             b = load_raw("blueribbon.csv")
         n = load_neon_guide("neon_guide_audited_final.csv")
-        all_places = m + b + n
+        # Michelin entries win collisions, so they go in first and the rest only fill gaps
         unique = {}
-        for p in all_places:
-            key = slugify(f"{p.name} {p.address or ''}")
-            if key not in unique:
-                unique[key] = p
-            elif p.source == "michelin":
-                unique[key] = p
+        for p in m:
+            unique[canon_key(p.name, p.address)] = p
+        for p in b + n:
+            unique.setdefault(canon_key(p.name, p.address), p)
         merged = list(unique.values())
-        enrich_places_with_ledger(merged, KakaoLedger(DIR_CACHE / "kakao_ledger.json"))
+        enrich_places_with_ledger(merged, KakaoLedger(DIR_CACHE / "kakao_ledger.sqlite"))
         write_geojson(merged)
 
 if __name__ == "__main__":
@@ -1,11 +1,27 @@
 import os
-import json
+import random
+import re
+import httpx
+import io
+import orjson
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from dotenv import load_dotenv
-from typing import Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlite_cache import SqliteCache
+from pydantic import BaseModel
+from typing import Any, Literal
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it the image is sent as downloaded
+    Image = None
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, 'soul-food-api', '.env')
@@ -16,12 +32,149 @@ API_KEY = os.getenv("GEMINI_API_KEY")
 if not API_KEY:
     raise ValueError("🚨 ERROR: Could not find GEMINI_API_KEY. Check your .env file!")
 
-client = genai.Client(api_key=API_KEY)
+_client = None
+
+
+def get_client():
+    """Builds the shared Gemini client on first use; forked children build their own."""
+    global _client
+    if _client is None:
+        _client = genai.Client(api_key=API_KEY)
+    return _client
+
+
+def _reset_client_after_fork():
+    global _client
+    _client = None
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+
+# ==========================================
+# 🚦 PROACTIVE GEMINI BUDGET
+# Evaluations run on several threads; pace them below the quota instead of bouncing off 429s
+# ==========================================
+class GeminiBudget:
+    """Blocking token bucket over requests/minute and (estimated) tokens/minute for one model."""
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, est_tokens):
+        est_tokens = min(est_tokens, self.tpm)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.requests >= 1 and self.tokens >= est_tokens:
+                    self.requests -= 1
+                    self.tokens -= est_tokens
+                    return
+                wait = max((1 - self.requests) * 60 / self.rpm, (est_tokens - self.tokens) * 60 / self.tpm)
+            time.sleep(wait)
+
+    def settle(self, est_tokens, actual_tokens):
+        # Swap the estimate for the real usage Gemini reported
+        with self.lock:
+            self.tokens = min(self.tpm, self.tokens + est_tokens - actual_tokens)
+
+
+# Paid tier-1 quotas, with headroom
+GEMINI_BUDGETS = {
+    'gemini-2.5-flash-lite': GeminiBudget(rpm=3000, tpm=3_000_000),
+    'gemini-2.5-flash': GeminiBudget(rpm=800, tpm=800_000),
+}
+
+
+def estimate_tokens(contents, config):
+    """Rough upper bound: ~2 chars per token for Korean-heavy text, plus room for the reply."""
+    parts = [contents] if isinstance(contents, str) else contents
+    chars = sum(len(p) for p in parts if isinstance(p, str)) + len(config.system_instruction or "")
+    return chars // 2 + 2000
+
+
+# ==========================================
+# 🔁 TRANSIENT-ERROR RETRIES
+# Only quota (429), server (5xx) and network hiccups are retried; bad JSON falls through to the local model
+# ==========================================
+GEMINI_MAX_ATTEMPTS = 4
+
+
+def is_transient(e):
+    if isinstance(e, errors.ServerError):
+        return True
+    if isinstance(e, errors.ClientError):
+        return e.code == 429
+    return isinstance(e, (httpx.TimeoutException, httpx.NetworkError))
+
+
+def retry_delay(e, attempt):
+    """Gemini's own RetryInfo delay on a 429 if it sent one, else capped exponential backoff with jitter."""
+    try:
+        for detail in e.details["error"]["details"]:
+            if detail.get("@type", "").endswith("RetryInfo"):
+                return float(detail["retryDelay"].rstrip("s"))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        pass
+    return min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def generate_json(model, contents, config, label):
+    """generate_content + JSON parse, retrying transient failures with backoff."""
+    budget = GEMINI_BUDGETS.get(model)
+    est_tokens = estimate_tokens(contents, config)
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        if budget:
+            budget.acquire(est_tokens)
+        try:
+            response = get_client().models.generate_content(model=model, contents=contents, config=config)
+            if budget and response.usage_metadata and response.usage_metadata.total_token_count:
+                budget.settle(est_tokens, response.usage_metadata.total_token_count)
+            break
+        except Exception as e:
+            if attempt == GEMINI_MAX_ATTEMPTS - 1 or not is_transient(e):
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"   ⏳ [{label}] Transient Gemini error ({getattr(e, 'code', type(e).__name__)}). "
+                  f"Retrying in {delay:.1f}s ({attempt + 1}/{GEMINI_MAX_ATTEMPTS})...")
+            time.sleep(delay)
+    return orjson.loads(response.text)
 
 # Define your local model here so it's easy to change later
 LOCAL_MODEL = "qwen2.5:3b"
+# Cloud models per stage; CRITIC_MODEL=gemini-2.5-flash-lite runs the cheaper judge for comparison sweeps
+ANALYST_MODEL = "gemini-2.5-flash-lite"
+CRITIC_MODEL = os.getenv("CRITIC_MODEL", "gemini-2.5-flash")
+
+# Coordinator answers survive restarts here (keyword -> category list)
+CATEGORY_CACHE_PATH = os.path.join(script_dir, 'data', 'cache', 'kakao_categories.sqlite')
+
+
+category_cache = SqliteCache(CATEGORY_CACHE_PATH)
+
+
+def load_cached_categories(keyword):
+    return category_cache.get(keyword)
+
 
+def save_cached_categories(keyword, categories):
+    category_cache.set(keyword, categories)
 
+
+@lru_cache(maxsize=1024)
 def get_kakao_categories(keyword, strict_mode=False):
     """
     Acts as a Pre-Flight Coordinator.
@@ -31,6 +184,11 @@ def get_kakao_categories(keyword, strict_mode=False):
         print(f"🔒 STRICT MODE ON: Bypassing AI. Locking target strictly to '{keyword}'.")
         return [keyword]
 
+    cached = load_cached_categories(keyword)
+    if cached:
+        print(f"🧠 Coordinator: '{keyword}' -> {cached} (cached)")
+        return cached
+
     print(f"🧠 Coordinator: Translating '{keyword}' into Kakao categories...")
 
     # 🚨 THE FIX: Explicitly ask for a JSON Object (Dictionary) to satisfy Ollama's format requirement
@@ -71,12 +229,13 @@ def get_kakao_categories(keyword, strict_mode=False):
         response.raise_for_status()
 
         # 🚨 THE FIX: Extract the list using the dictionary key
-        result_dict = json.loads(response.json()['response'])
+        result_dict = orjson.loads(orjson.loads(response.content)['response'])
         categories = result_dict.get("categories", [])
 
         if isinstance(categories, list) and len(categories) > 0:
             categories = categories[:3]
             print(f"   ✅ Categories locked in by Local AI: {categories}")
+            save_cached_categories(keyword, categories)
             return categories
         else:
             raise ValueError("Local AI returned JSON, but the 'categories' list was missing or empty.")
@@ -84,21 +243,22 @@ def get_kakao_categories(keyword, strict_mode=False):
     except Exception as e:
         print(f"   ⚠️ Local AI failed ({e}). Gracefully degrading to Gemini...")
         try:
-            gemini_response = client.models.generate_content(
-                model='gemini-2.5-flash-lite',
-                contents=f"Keyword: {keyword}",
-                config=types.GenerateContentConfig(
+            result_dict = generate_json(
+                'gemini-2.5-flash-lite',
+                f"Keyword: {keyword}",
+                types.GenerateContentConfig(
                     system_instruction=instruction,
                     response_mime_type="application/json",
                     temperature=0.1
-                )
+                ),
+                "Coordinator"
             )
-
-            result_dict = json.loads(gemini_response.text)
             categories = result_dict.get("categories", [])[:3]
 
             if not categories:
                 categories = [keyword]  # Ultimate fallback
+            else:
+                save_cached_categories(keyword, categories)
 
             print(f"   ✅ Categories locked in by Gemini: {categories}")
             return categories
@@ -106,13 +266,19 @@ def get_kakao_categories(keyword, strict_mode=False):
             print(f"   ❌ Both AI systems failed: {gemini_e}. Defaulting to keyword only.")
             return [keyword]
 
+# One keep-alive pool for the Naver image CDN (shared by the evaluator threads)
+image_session = requests.Session()
+image_session.headers.update({"Referer": "https://blog.naver.com"})
+image_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10,
+                                            max_retries=Retry(total=2, backoff_factor=0.3)))
+
+
 def get_image_bytes(image_url):
     """Fetches the raw bytes of an image to feed to the AIs."""
     if not image_url:
         return None
     try:
-        headers = {"Referer": "https://blog.naver.com"}
-        response = requests.get(image_url, headers=headers, timeout=5)
+        response = image_session.get(image_url, timeout=5)
         if response.status_code == 200:
             return response.content
     except Exception as e:
@@ -120,41 +286,33 @@ def get_image_bytes(image_url):
     return None
 
 
-def evaluate_restaurant(restaurant_name, scraped_blog_data, search_keyword):
-    print(f"\n🧠 Junior Analyst: Verifying '{search_keyword}' and extracting Michelin criteria...")
-
-    # ==========================================
-    # 🚨 THE TRUNCATION SAFETY NET
-    # Prevent Base64 HTML bloat from blowing up the 1M token window
-    # ==========================================
-    safe_texts = []
-    for item in scraped_blog_data:
-        raw_text = item.get("text", "")
+IMAGE_MAX_SIDE = 512
+IMAGE_JPEG_QUALITY = 70
 
-        # 1. Swap double quotes for single quotes (prevents JSON string breaks)
-        # 2. Strip raw newlines and tabs
-        clean_text = raw_text.replace('"', "'").replace('\n', ' ').replace('\t', ' ')
-
-        # 3. Cap every single blog at exactly 10,000 characters
-        safe_texts.append(clean_text[:10000])
 
-    # Join with a clean delimiter
-    combined_text = " --- NEXT REVIEW --- ".join(safe_texts)
-    # ==========================================
+def shrink_image(image_bytes):
+    """
+    Downscales the banner to a small JPEG: the lie detector only needs to read the
+    caption, and a 100-500 KB original costs upload time and image tokens for nothing.
+    """
+    if not image_bytes or Image is None:
+        return image_bytes
+    try:
+        im = Image.open(io.BytesIO(image_bytes))
+        im.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+        buf = io.BytesIO()
+        im.convert("RGB").save(buf, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    except Exception as e:
+        print(f"⚠️ Could not shrink lie detector image ({e}). Sending original.")
+        return image_bytes
+    return buf.getvalue() if buf.tell() < len(image_bytes) else image_bytes
 
-    image_bytes = None
-    for item in scraped_blog_data:
-        for img_url in item.get("bottom_images", []):
-            image_bytes = get_image_bytes(img_url)
-            if image_bytes:
-                break
-        if image_bytes:
-            break
 
-    # ==========================================
-    # PHASE 1: The Junior Analyst (Fact Extractor)
-    # ==========================================
-    analyst_instruction = f"""
+# ==========================================
+# 📝 PROMPT TEMPLATES
+# Only {search_keyword} varies, so the text and the Gemini configs are built once per keyword
+# ==========================================
+ANALYST_INSTRUCTION = """
     <role>
     You are a rigorous, skeptical data analyst reviewing Korean blog posts.
     Your mission is NOT to summarize praise. Your mission is to extract verifiable signals of quality.
@@ -221,88 +379,7 @@ Use the exact structure below:
     </output_format>
     """
 
-    full_analyst_prompt = f"{analyst_instruction}\n\nAnalyze these reviews for {restaurant_name}:\n\n{combined_text}"
-    analyst_data = None
-
-    analyst_data = None
-    max_retries = 3
-
-    for attempt in range(max_retries):
-        try:
-            print(f"   [Junior Analyst] Asking Cloud Gemini (Attempt {attempt + 1}/{max_retries})...")
-            payload_contents: list[Any] = [f"Analyze these reviews for {restaurant_name}:\n\n{combined_text}"]
-            if image_bytes:
-                payload_contents.append(types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg"))
-
-            gemini_response = client.models.generate_content(
-                model='gemini-2.5-flash-lite',
-                contents=payload_contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=analyst_instruction,
-                    response_mime_type="application/json",
-                    temperature=0.2
-                )
-            )
-            analyst_data = json.loads(gemini_response.text)
-            print("   ✅ Gemini successfully extracted facts!")
-            break  # Success! Break out of the retry loop
-
-        except Exception as e:
-            error_str = str(e)
-            if "503" in error_str and attempt < max_retries - 1:
-                print(f"   ⏳ Server overloaded (503). Waiting 3 seconds before retry...")
-                time.sleep(3)
-            else:
-                print(f"   ⚠️ Cloud AI failed permanently ({e}). Falling back to Local {LOCAL_MODEL}...")
-
-                # --- LOCAL FALLBACK BLOCK GOES HERE ---
-                try:
-                    payload = {"model": LOCAL_MODEL, "prompt": full_analyst_prompt, "stream": False, "format": "json"}
-                    response = requests.post('http://localhost:11434/api/generate', json=payload, timeout=90)
-                    response.raise_for_status()
-                    analyst_data = json.loads(response.json()['response'])
-                    print("   ✅ Local AI successfully extracted facts!")
-                except Exception as local_e:
-                    print(f"   ❌ Both AI systems failed Junior Analyst stage: {local_e}")
-                    return None
-                break  # Break out of the loop after local attempt
-
-    # ==========================================
-    # 🛡️ THE BULLETPROOF DATA UNWRAPPER
-    # Guaranteed to yield a dictionary no matter how the AI wraps it
-    # ==========================================
-    if isinstance(analyst_data, str):
-        try:
-            analyst_data = json.loads(analyst_data)
-        except:
-            pass
-
-    # Unwrap lists (and nested lists!)
-    while isinstance(analyst_data, list):
-        if len(analyst_data) > 0:
-            analyst_data = analyst_data[0]
-        else:
-            analyst_data = {}
-
-    # Final Failsafe
-    if not isinstance(analyst_data, dict):
-        analyst_data = {}
-    # ==========================================
-
-    if not analyst_data.get("serves_target_food", False):
-        print(f"   🛑 REJECTED: Does not focus on {search_keyword}.")
-        return {"score": 0, "award_level": "None", "justification": f"Does not specialize in {search_keyword}."}
-
-    extracted_facts = analyst_data.get("extracted_facts_ko", "")
-    print(
-        f"   ✅ Facts extracted. Sponsorship: {analyst_data.get('sponsored_ratio', 'Unknown')}. Handing to Head Critic.")
-
-    # ==========================================
-    # PHASE 2: The Head Critic (The Michelin Judge)
-    # ==========================================
-    print(f"👑 Head Critic: Scoring rigorously...")
-
-    critic_instruction = f"""
+CRITIC_INSTRUCTION = """
         <role>
         You are the Head Critic for the 'Neon Guide', evaluating restaurants for: {search_keyword}.
         You apply the rigorous standards of fine dining to everyday comfort food. Be exceptionally strict and mathematically precise.
@@ -357,20 +434,282 @@ Use the exact structure below:
         </output_format>
     """
 
+
+# Structured-output schemas: Gemini decodes straight into these shapes, so no stray markdown or prose
+class ValidationChecklist(BaseModel):
+    is_primary_menu_item: bool
+    has_sponsorship_disclosure: bool
+    is_generic_franchise_or_diner: bool
+
+
+class AnalystOutput(BaseModel):
+    validation_checklist: ValidationChecklist
+    serves_target_food: bool
+    sponsored_ratio: str
+    extracted_facts_ko: str
+
+
+class ScoreBreakdown(BaseModel):
+    ingredients: int
+    technique: int
+    personality: int
+    value: int
+    consistency: int
+    sponsorship_penalty_applied: bool
+
+
+class CriticOutput(BaseModel):
+    score_breakdown: ScoreBreakdown
+    score: int
+    award_level: Literal["3 Neon Hearts", "2 Neon Hearts", "1 Neon Heart", "None"]
+    description_en: str
+    description_ko: str
+    justification: str
+
+
+@lru_cache(maxsize=256)
+def analyst_config(search_keyword):
+    return types.GenerateContentConfig(
+        system_instruction=ANALYST_INSTRUCTION.format(search_keyword=search_keyword),
+        response_mime_type="application/json",
+        response_schema=AnalystOutput,
+        temperature=0.2
+    )
+
+
+@lru_cache(maxsize=256)
+def critic_config(search_keyword):
+    return types.GenerateContentConfig(
+        system_instruction=CRITIC_INSTRUCTION.format(search_keyword=search_keyword),
+        response_mime_type="application/json",
+        response_schema=CriticOutput,
+        temperature=0.4
+    )
+
+
+# Sponsorship disclosures the analyst counts; these lines are never trimmed away
+SPONSOR_RE = re.compile(r'협찬|원고료|제공받|지원받')
+WHITESPACE_RE = re.compile(r'\s+')
+MIN_LINE_CHARS = 8  # over budget, shorter lines (captions, emoji rows, "ㅋㅋㅋ") go first
+FINGERPRINT_RE = re.compile(r'[\W_]+')
+MIN_SHARED_CHARS = 20  # lines this long that recur across posts are copy-pasted promo blurbs
+ANALYST_CHAR_BUDGET = 40000  # whole review corpus handed to the Junior Analyst
+RATIO_RE = re.compile(r'(\d+)\s*/\s*(\d+)')
+
+# 🚪 Pre-flight reject rules: target -> (must-have terms, red-flag regexes). A restaurant is rejected
+# without any AI call only when its raw reviews hit none of the must-haves (or the target itself)
+# and at least PREFLIGHT_MIN_RED_FLAGS red flags. Targets without a rule always go to the analyst.
+# Red flags are anchored so everyday words don't count: 테라스 (terrace), 카스테라/카스텔라 (sponge cake).
+PREFLIGHT_RULES = {
+    "수제맥주": (("수제맥주", "크래프트", "IPA", "양조장", "브루어리", "에일"),
+                 (r"카스(?!테라|텔라|타드)", r"(?<!카스)테라(?!스|피|코타)", r"켈리")),
+}
+PREFLIGHT_MIN_RED_FLAGS = 3
+CRITIC_SKIP_SPONSORED = 0.8  # above this the critic's >=75% rule caps the score at 70 anyway
+
+
+@lru_cache(maxsize=None)
+def preflight_patterns(search_keyword):
+    """Compiled (must-have, red-flag) scanners for a target, or None when it has no rule."""
+    rule = PREFLIGHT_RULES.get(search_keyword)
+    if rule is None:
+        return None
+    must_have, red_flags = rule
+    # Must-haves are matched with spaces removed, so "수제 맥주" still counts
+    must_have = {term.replace(" ", "") for term in (search_keyword, *must_have)}
+    return (re.compile("|".join(map(re.escape, must_have)), re.IGNORECASE),
+            re.compile("|".join(red_flags)))
+
+
+def fetch_first_image(image_urls):
+    """
+    Downloads the candidate banner images concurrently and returns the first one,
+    in post order, that succeeded. A dead URL no longer costs a serial 5s timeout.
+    """
+    if not image_urls:
+        return None
+    pool = ThreadPoolExecutor(max_workers=min(8, len(image_urls)))
+    try:
+        for image_bytes in pool.map(get_image_bytes, image_urls):
+            if image_bytes:
+                return image_bytes
+        return None
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def compact_review(text, budget=10000, shared=None):
+    """
+    Drops repeated lines from one scraped review and fits it to `budget` characters,
+    shedding short filler lines first when it does not fit. Nested se-text blocks on Naver make the scraper emit the same
+    paragraph more than once. Pass the same `shared` set for every review of a
+    restaurant to also drop paragraphs an earlier post already carried.
+    """
+    seen = set()
+    kept = []
+    disclosures = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or line in seen:
+            continue
+        seen.add(line)
+        is_disclosure = SPONSOR_RE.search(line) is not None
+        if shared is not None and not is_disclosure:
+            # Punctuation/spacing-insensitive fingerprint catches lightly edited copies
+            fingerprint = FINGERPRINT_RE.sub('', line)
+            if len(fingerprint) >= MIN_SHARED_CHARS:
+                if fingerprint in shared:
+                    continue
+                shared.add(fingerprint)
+        kept.append(line)
+        if is_disclosure:
+            disclosures.append(line)
+
+    compact = '\n'.join(kept)
+    if len(compact) <= budget:
+        return compact
+
+    # Over budget: shed short filler lines first (short lines like "바삭바삭" survive in reviews that fit)
+    compact = '\n'.join(line for line in kept if len(line) >= MIN_LINE_CHARS or line in disclosures)
+    if len(compact) <= budget:
+        return compact
+
+    # Keep the head of the post, but re-attach disclosures (they usually sit at the very bottom)
+    tail = '\n'.join(disclosures)[:budget // 2]
+    if not tail:
+        return compact[:budget]
+    return f"{compact[:budget - len(tail) - 1]}\n{tail}"
+
+
+def evaluate_restaurant(restaurant_name, scraped_blog_data, search_keyword):
+    print(f"\n🧠 Junior Analyst: Verifying '{search_keyword}' and extracting Michelin criteria...")
+
+    # ==========================================
+    # 🚨 THE TRUNCATION SAFETY NET
+    # Prevent Base64 HTML bloat from blowing up the 1M token window
+    # ==========================================
+    safe_texts = []
+    per_review_budget = min(10000, ANALYST_CHAR_BUDGET // max(1, len(scraped_blog_data)))
+    shared_paragraphs = set()
+    for item in scraped_blog_data:
+        raw_text = compact_review(item.get("text", ""), per_review_budget, shared_paragraphs)
+
+        # 1. Swap double quotes for single quotes (prevents JSON string breaks)
+        # 2. Collapse newlines, tabs and space runs (NBSP padding too) into single spaces
+        clean_text = WHITESPACE_RE.sub(' ', raw_text.replace('"', "'"))
+
+        # 3. Every blog is already capped at its share of ANALYST_CHAR_BUDGET (10,000 max)
+        safe_texts.append(clean_text)
+
+    # Join with a clean delimiter
+    combined_text = " --- NEXT REVIEW --- ".join(safe_texts)
+    # ==========================================
+
+    # 🚪 PRE-FLIGHT REJECT: scanned on the raw reviews (before compaction drops short lines),
+    # and only when the red flags clearly outweigh zero must-have hits
+    patterns = preflight_patterns(search_keyword)
+    if patterns:
+        must_re, red_re = patterns
+        raw_corpus = "\n".join(item.get("text", "") for item in scraped_blog_data)
+        if (must_re.search(raw_corpus.replace(" ", "")) is None
+                and len(red_re.findall(raw_corpus)) >= PREFLIGHT_MIN_RED_FLAGS):
+            print(f"   🛑 REJECTED (pre-flight): No review mentions {search_keyword}, only red flags. Skipping AI.")
+            return {"score": 0, "award_level": "None", "justification": f"Does not specialize in {search_keyword}."}
+
+    image_bytes = shrink_image(
+        fetch_first_image([url for item in scraped_blog_data for url in item.get("bottom_images", [])]))
+
+    # ==========================================
+    # PHASE 1: The Junior Analyst (Fact Extractor)
+    # ==========================================
+    analyst_cfg = analyst_config(search_keyword)
+    analyst_instruction = analyst_cfg.system_instruction
+    full_analyst_prompt = f"{analyst_instruction}\n\nAnalyze these reviews for {restaurant_name}:\n\n{combined_text}"
+    analyst_data = None
+
+    try:
+        print(f"   [Junior Analyst] Asking Cloud Gemini...")
+        payload_contents: list[Any] = [f"Analyze these reviews for {restaurant_name}:\n\n{combined_text}"]
+        if image_bytes:
+            payload_contents.append(types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg"))
+
+        analyst_data = generate_json(ANALYST_MODEL, payload_contents, analyst_cfg, "Junior Analyst")
+        print("   ✅ Gemini successfully extracted facts!")
+
+    except Exception as e:
+        print(f"   ⚠️ Cloud AI failed permanently ({e}). Falling back to Local {LOCAL_MODEL}...")
+
+        # --- LOCAL FALLBACK BLOCK GOES HERE ---
+        try:
+            payload = {"model": LOCAL_MODEL, "prompt": full_analyst_prompt, "stream": False, "format": "json"}
+            response = requests.post('http://localhost:11434/api/generate', json=payload, timeout=90)
+            response.raise_for_status()
+            analyst_data = orjson.loads(orjson.loads(response.content)['response'])
+            print("   ✅ Local AI successfully extracted facts!")
+        except Exception as local_e:
+            print(f"   ❌ Both AI systems failed Junior Analyst stage: {local_e}")
+            return None
+
+    # ==========================================
+    # 🛡️ THE BULLETPROOF DATA UNWRAPPER
+    # Guaranteed to yield a dictionary no matter how the AI wraps it
+    # ==========================================
+    if isinstance(analyst_data, str):
+        try:
+            analyst_data = orjson.loads(analyst_data)
+        except:
+            pass
+
+    # Unwrap lists (and nested lists!)
+    while isinstance(analyst_data, list):
+        if len(analyst_data) > 0:
+            analyst_data = analyst_data[0]
+        else:
+            analyst_data = {}
+
+    # Final Failsafe
+    if not isinstance(analyst_data, dict):
+        analyst_data = {}
+    # ==========================================
+
+    if not analyst_data.get("serves_target_food", False):
+        print(f"   🛑 REJECTED: Does not focus on {search_keyword}.")
+        return {"score": 0, "award_level": "None", "justification": f"Does not specialize in {search_keyword}."}
+
+    extracted_facts = analyst_data.get("extracted_facts_ko", "")
+    sponsored_ratio = analyst_data.get('sponsored_ratio', 'unknown')
+
+    # 💸 DIRECT VERDICT: an overwhelmingly paid-for review pool never earns a real score
+    ratio = RATIO_RE.search(str(sponsored_ratio))
+    if ratio and int(ratio.group(2)) > 0 and int(ratio.group(1)) / int(ratio.group(2)) > CRITIC_SKIP_SPONSORED:
+        print(f"   🛑 REJECTED: {sponsored_ratio}. Skipping Head Critic.")
+        # Same shape as a real critic verdict (flat 12/20 per category) so the CSV row is complete
+        verdict = CriticOutput(
+            score_breakdown=ScoreBreakdown(ingredients=12, technique=12, personality=12, value=12,
+                                           consistency=12, sponsorship_penalty_applied=True),
+            score=60, award_level="None", description_en="", description_ko="",
+            justification="High sponsorship ratio; insufficient organic signal.",
+        ).model_dump()
+        verdict['sponsored_ratio'] = sponsored_ratio
+        return verdict
+
+    print(
+        f"   ✅ Facts extracted. Sponsorship: {analyst_data.get('sponsored_ratio', 'Unknown')}. Handing to Head Critic.")
+
+    # ==========================================
+    # PHASE 2: The Head Critic (The Michelin Judge)
+    # ==========================================
+    print(f"👑 Head Critic: Scoring rigorously...")
+
+    critic_cfg = critic_config(search_keyword)
+    critic_instruction = critic_cfg.system_instruction
+
     full_critic_prompt = f"{critic_instruction}\n\nCritique this summary for {restaurant_name}:\n\n{extracted_facts}"
 
     try:
         print(f"   [Head Critic] Asking Cloud Gemini first...")
-        gemini_response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=f"Critique this summary for {restaurant_name}:\n\n{extracted_facts}",
-            config=types.GenerateContentConfig(
-                system_instruction=critic_instruction,
-                response_mime_type="application/json",
-                temperature=0.4
-            )
-        )
-        critic_data = json.loads(gemini_response.text)
+        critic_data = generate_json(CRITIC_MODEL, f"Critique this summary for {restaurant_name}:\n\n{extracted_facts}",
+                                    critic_cfg, "Head Critic")
         critic_data['sponsored_ratio'] = analyst_data.get('sponsored_ratio', 'unknown')
         print("   ✅ Gemini successfully scored the restaurant!")
         return critic_data
@@ -384,7 +723,7 @@ Use the exact structure below:
                 timeout=45
             )
             response.raise_for_status()
-            critic_data = json.loads(response.json()['response'])
+            critic_data = orjson.loads(orjson.loads(response.content)['response'])
             critic_data['sponsored_ratio'] = analyst_data.get('sponsored_ratio', 'unknown')
             print("   ✅ Local AI successfully scored the restaurant!")
             return critic_data
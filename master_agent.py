@@ -1,13 +1,20 @@
+import atexit
 import os
+import orjson
 import requests
 import time
 import random
+import re
 import csv
 import sys
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlite_cache import SqliteCache
 
-from naver_agent import search_naver_blogs, scrape_naver_blog_text
+from naver_agent import search_naver_blogs, scrape_naver_blog_text, load_cached_blog
 from critic_agent import evaluate_restaurant, get_kakao_categories
 
 # Pathing setup
@@ -17,6 +24,13 @@ load_dotenv(dotenv_path=env_path)
 
 KAKAO_API_KEY = os.getenv("KAKAO_REST_API_KEY")
 
+# One keep-alive pool to dapi.kakao.com for every page of every sweep (no TLS handshake per call)
+kakao_session = requests.Session()
+kakao_session.headers.update({"Authorization": f"KakaoAK {KAKAO_API_KEY}"})
+kakao_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(
+    total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"], respect_retry_after_header=True)))
+
 # ==========================================
 # ⚙️ THE SEOUL MASTER QUEUE (ALL 25 DISTRICTS)
 # ==========================================
@@ -31,71 +45,126 @@ KEYWORDS = {
 }
 
 MAX_PLACES_PER_SEARCH = 45
+EVAL_WORKERS = 3  # Gemini evaluations allowed in flight while scraping continues
 CSV_FILENAME = os.path.join(script_dir, 'neon_guide_review_queue.csv')
+DISCOVERY_CACHE_PATH = os.path.join(script_dir, 'data', 'cache', 'kakao_discovery.sqlite')
+DISCOVERY_PAGES = 3  # Kakao stops paging keyword results at 45
+DISCOVERY_TTL = 24 * 60 * 60  # Kakao rankings barely move day-to-day
 
 # ==========================================
 
+discovery_cache = SqliteCache(DISCOVERY_CACHE_PATH, ttl=DISCOVERY_TTL)
+
+
+def load_cached_discovery(query):
+    return discovery_cache.get(query)
+
+
+def save_cached_discovery(query, places):
+    discovery_cache.set(query, places)
+
+
+def fetch_discovery_page(query, page):
+    """Fetches one page of Kakao keyword results (None on failure)."""
+    url = "https://dapi.kakao.com/v2/local/search/keyword.json"
+    params = {
+        "query": query,
+        "size": 15,  # Kakao's strict limit per page
+        "page": page
+    }
+
+    try:
+        response = kakao_session.get(url, params=params, timeout=10)
+        if response.status_code == 200:
+            return orjson.loads(response.content)
+        print(f"❌ Kakao API Error on page {page}: {response.status_code}")
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Network error connecting to Kakao: {e}")
+    except orjson.JSONDecodeError as e:
+        print(f"❌ Kakao returned unreadable JSON on page {page}: {e}")
+    return None
+
+
 def discover_restaurants(keyword, location, max_results):
     """
     Paginated Discovery Agent: Sweeps up to 3 pages (45 results)
     to prevent true hotspots from being buried by Kakao's SEO keyword ranking.
     """
     print(f"\n🗺️ Discovery Agent: Deep-sweeping Kakao for '{location} {keyword}'...")
-    url = "https://dapi.kakao.com/v2/local/search/keyword.json"
-    headers = {"Authorization": f"KakaoAK {KAKAO_API_KEY}"}
+    query = f"{location} {keyword}"
+    cached = load_cached_discovery(query)
+    if cached is not None:
+        print(f"💾 Reusing {len(cached)} spots swept within the last day.")
+        return cached[:max_results]
 
     all_places = []
-
-    # Sweep Page 1, Page 2, and Page 3 (15 items per page)
-    for page in range(1, 4):
-        params = {
-            "query": f"{location} {keyword}",
-            "size": 15, # Kakao's strict limit per page
-            "page": page
-        }
-
-        try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                documents = data.get('documents', [])
-                all_places.extend(documents)
-
-                # If we hit the end of Kakao's database before page 3, break early
-                if data.get('meta', {}).get('is_end', True):
-                    break
-            else:
-                print(f"❌ Kakao API Error on page {page}: {response.status_code}")
-                break
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️ Network error connecting to Kakao: {e}")
-            break
+    complete = True  # Only a sweep that finished cleanly is worth caching
+
+    # Page 1 tells us how deep Kakao's results go; the remaining pages (15 items each) are fetched together
+    first = fetch_discovery_page(query, 1)
+    if first is None:
+        complete = False
+    else:
+        all_places.extend(first.get('documents', []))
+        meta = first.get('meta', {})
+
+        # If we hit the end of Kakao's database on page 1, there is nothing left to sweep
+        if not meta.get('is_end', True):
+            last_page = min(DISCOVERY_PAGES, -(-meta.get('pageable_count', DISCOVERY_PAGES * 15) // 15))
+            with ThreadPoolExecutor(max_workers=DISCOVERY_PAGES - 1) as pool:
+                for data in pool.map(lambda page: fetch_discovery_page(query, page), range(2, last_page + 1)):
+                    if data is None:
+                        complete = False
+                        break
+                    all_places.extend(data.get('documents', []))
 
     print(f"✅ Recovered {len(all_places)} spots from the Kakao depths.")
+    if complete:
+        save_cached_discovery(query, all_places)
     return all_places[:max_results]
 
 
-def append_to_csv(row_dict):
-    """LIVE CHECKPOINTING: Saves one row to the CSV immediately."""
+# 🚨 THE FIX: Added the 4 new Auditor columns to the master list
+CSV_HEADERS = [
+    "Neighborhood", "Keyword", "Restaurant Name", "Score", "Award Level",
+    "AI Justification", "English Desc", "Korean Desc", "Kakao URL", "Lat", "Lon",
+    "Sponsored Ratio", "Auditor Comments", "Rating Justified", "Auditor Reason",
+    "Needs Manual Review", "Upgrade Recommended"
+]
+
+# The staging CSV stays open for the whole sweep instead of being reopened per row
+_csv_file = None
+_csv_writer = None
 
-    # 🚨 THE FIX: Added the 4 new Auditor columns to the master list
-    headers = [
-        "Neighborhood", "Keyword", "Restaurant Name", "Score", "Award Level",
-        "AI Justification", "English Desc", "Korean Desc", "Kakao URL", "Lat", "Lon",
-        "Sponsored Ratio", "Auditor Comments", "Rating Justified", "Auditor Reason",
-        "Needs Manual Review", "Upgrade Recommended"
-    ]
 
+def _open_csv():
+    global _csv_file, _csv_writer
     file_exists = os.path.isfile(CSV_FILENAME)
+    _csv_file = open(CSV_FILENAME, 'a', newline='', encoding='utf-8-sig')
+    # 🚨 THE FIX: added extrasaction='ignore' just in case of dict mismatches
+    _csv_writer = csv.DictWriter(_csv_file, fieldnames=CSV_HEADERS, extrasaction='ignore')
+    if not file_exists:
+        _csv_writer.writeheader()
 
-    with open(CSV_FILENAME, 'a', newline='', encoding='utf-8-sig') as f:
-        # 🚨 THE FIX: added extrasaction='ignore' just in case of dict mismatches
-        writer = csv.DictWriter(f, fieldnames=headers, extrasaction='ignore')
-        if not file_exists:
-            writer.writeheader()
 
-        # Write the row. The dictionary won't have the 4 new keys, so DictWriter will automatically leave those CSV cells blank!
-        writer.writerow(row_dict)
+def close_csv():
+    global _csv_file, _csv_writer
+    if _csv_file is not None:
+        _csv_file.close()
+    _csv_file, _csv_writer = None, None
+
+
+atexit.register(close_csv)  # once per process; a no-op when nothing is open
+
+
+def append_to_csv(row_dict):
+    """LIVE CHECKPOINTING: Saves one row to the CSV immediately."""
+    if _csv_writer is None:
+        _open_csv()
+
+    # Write the row. The dictionary won't have the 4 new keys, so DictWriter will automatically leave those CSV cells blank!
+    _csv_writer.writerow(row_dict)
+    _csv_file.flush()  # Hand the row to the OS now so a crash never loses a scored restaurant
 
 
 def load_existing_restaurants():
@@ -112,45 +181,95 @@ def load_existing_restaurants():
     for file_path in files_to_check:
         if os.path.isfile(file_path):
             with open(file_path, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    name = row.get("Restaurant Name")
-                    if name:
-                        seen_names.add(name)
+                # Plain rows + one column index: no per-row dict just to read a single cell
+                reader = csv.reader(f)
+                header = next(reader, [])
+                if "Restaurant Name" not in header:
+                    continue
+                col = header.index("Restaurant Name")
+                seen_names.update(row[col] for row in reader if len(row) > col and row[col])
 
     print(f"🧠 Master Agent Memory: {len(seen_names)} previously seen places will be skipped.")
     return seen_names
 
-def is_strong_hit(place, keyword, valid_categories, expected_neighborhood):
+def is_strong_hit(place, search_clean, valid_categories, expected_neighborhood):
     """
     Agile pre-filter powered by Geographic bounds and Direct Name Matching.
+    search_clean is the search bait with its spaces already removed (done once per keyword).
     """
-    restaurant_name = place.get('place_name', '')
-    address = place.get('address_name', '')
+    # 🚨 THE GEOGRAPHIC BOUNCER
+    # If it is physically inside the neighborhood, let the AI pipeline judge it!
+    # (Checked first: it is a plain substring test and settles most places without touching the name.)
+    if expected_neighborhood in place.get('address_name', ''):
+        return True
 
     # ==========================================
     # 🚨 THE DIRECT HIT LOOPHOLE
     # ==========================================
+    # Outside the neighborhood, only a direct name match gets through.
     # Remove spaces to ensure "미스터리 브루잉" matches "미스터리브루잉컴퍼니"
-    search_clean = keyword.replace(" ", "")
-    name_clean = restaurant_name.replace(" ", "")
+    name_clean = place.get('place_name', '').replace(" ", "")
+    return search_clean in name_clean
+
+
+def save_evaluation(evaluation, neighborhood, master_target, restaurant_name, place):
+    """Writes one finished Gemini evaluation to the staging queue."""
+    if not evaluation:
+        print(f"❌ AI failed to evaluate {restaurant_name}.")
+        return
+
+    score = evaluation.get('score', 0)
+    print(f"🎯 AI Scored {restaurant_name}: {score}/100")
+
+    row = {
+        "Neighborhood": neighborhood,
+        # FIX 2: Save it under the master_target so your lists stay clean!
+        "Keyword": master_target,
+        "Restaurant Name": restaurant_name,
+        "Score": score,
+        "Award Level": evaluation.get('award_level', 'None'),
+        "AI Justification": evaluation.get('justification', ''),
+        "English Desc": evaluation.get('description_en', ''),
+        "Korean Desc": evaluation.get('description_ko', ''),
+        "Kakao URL": place.get('place_url', ''),
+        "Lat": place.get('y', ''),
+        "Lon": place.get('x', ''),
+        "Sponsored Ratio": evaluation.get('sponsored_ratio', ''),
+    }
+
+    append_to_csv(row)
+
+
+def drain_evaluations(pending, wait_all=False):
+    """Saves every evaluation that has finished (or all of them, if wait_all)."""
+    if not pending:
+        return
+    done, _ = wait(pending, return_when=ALL_COMPLETED if wait_all else FIRST_COMPLETED, timeout=None if wait_all else 0)
+    for future in done:
+        context = pending.pop(future)
+        try:
+            evaluation = future.result()
+        except Exception as e:
+            print(f"❌ Evaluation crashed for {context[2]}: {e}")
+            evaluation = None
+        save_evaluation(evaluation, *context)
 
-    if search_clean in name_clean:
-        # We don't care about the address. The name matches! Let it through.
-        return True
-    # ==========================================
 
-    # 🚨 THE GEOGRAPHIC BOUNCER
-    # If the name wasn't a direct match, it MUST be in the correct neighborhood.
-    if expected_neighborhood not in address:
-        return False
-
-    # If it is physically inside the neighborhood, let the AI pipeline judge it!
-    return True
+def pause(seconds, pending):
+    """Sleeps for `seconds`, saving each in-flight evaluation the moment it finishes."""
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        if not pending:
+            time.sleep(remaining)
+            return
+        wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        drain_evaluations(pending)
 
 
 def run_massive_pipeline():
     seen_places = load_existing_restaurants()
+    evaluator = ThreadPoolExecutor(max_workers=EVAL_WORKERS)
+    pending = {}  # future -> (neighborhood, master_target, restaurant_name, place)
 
     # 🔄 Unpack all three variables!
     for search_bait, (master_target, is_strict) in KEYWORDS.items():
@@ -158,20 +277,27 @@ def run_massive_pipeline():
         print(f"🎯 BAIT: {search_bait} | TARGET: {master_target} | STRICT: {is_strict}")
         print(f"*" * 50)
 
-        # Pass the strict flag to the Coordinator
-        valid_categories = get_kakao_categories(search_bait, strict_mode=is_strict)
+        # Pass the strict flag to the Coordinator (runs in the background while Kakao discovery starts)
+        categories_future = evaluator.submit(get_kakao_categories, search_bait, strict_mode=is_strict)
+
+        # 🚀 Fast-pass terms compiled once per keyword: one C-level scan per snippet
+        fast_pass_re = re.compile("|".join(map(re.escape, dict.fromkeys([search_bait, master_target]))))
+        bait_clean = search_bait.replace(" ", "")  # the Bouncer's name-match key
 
         for neighborhood in NEIGHBORHOODS:
             print(f"\n📍 INITIATING SECTOR SCAN: {neighborhood} ({search_bait})")
 
             # Use SEARCH BAIT for Kakao
             places_to_investigate = discover_restaurants(search_bait, neighborhood, MAX_PLACES_PER_SEARCH)
+            valid_categories = categories_future.result()
 
             for place in places_to_investigate:
+                drain_evaluations(pending)  # checkpoint anything that finished since the last place
+
                 restaurant_name = place['place_name']
 
                 # 🚀 Pass 'neighborhood' to the Bouncer and print the result!
-                if not is_strong_hit(place, search_bait, valid_categories, neighborhood):
+                if not is_strong_hit(place, bait_clean, valid_categories, neighborhood):
                     print(f"⏭️ Bouncing {restaurant_name} (Category or Geography mismatch).")
                     continue
 
@@ -190,15 +316,12 @@ def run_massive_pipeline():
 
                 # 🚀 THE FAST-PASS FILTER 🚀
                 # Dynamically look for the actual food we are searching for!
-                # Replace 'search_keyword' and 'target_keyword' with whatever variables your loop uses.
-                fast_pass_terms = [search_bait, master_target]
-
                 passed_fast_pass = False
                 for blog in blog_results:
-                    title = blog.get('title', '')
-                    snippet = blog.get('description', '')
+                    # One scan over title and snippet; no term contains a newline, so nothing matches across the seam
+                    haystack = blog.get('title', '') + "\n" + blog.get('description', '')
 
-                    if any(term in title or term in snippet for term in fast_pass_terms):
+                    if fast_pass_re.search(haystack):
                         passed_fast_pass = True
                         break  # We found proof! Stop checking snippets.
 
@@ -211,15 +334,24 @@ def run_massive_pipeline():
                 print(f"✅ Fast-Pass Passed! Scraping full blogs for {restaurant_name}...")
 
                 scraped_texts = []
+                fetched = 0  # blog pages actually requested from Naver (cache hits don't count)
+                next_allowed = time.monotonic()
                 for blog in blog_results:
                     url = blog['link']
-                    text = scrape_naver_blog_text(url)
+                    text = load_cached_blog(url)  # posts scraped on an earlier run cost Naver nothing
+
+                    if text is None:
+                        # Human Jitter, measured from the previous request's start: a slow blog already used up the gap
+                        delay = next_allowed - time.monotonic()
+                        if delay > 0:
+                            pause(delay, pending)
+                        next_allowed = time.monotonic() + random.uniform(1.5, 3.2)
+
+                        text = scrape_naver_blog_text(url)
+                        fetched += 1
                     if text:
                         scraped_texts.append(text)
 
-                    # Human Jitter
-                    time.sleep(random.uniform(1.5, 3.2))
-
                 if not scraped_texts:
                     print("⚠️ Not enough readable data. Skipping.")
                     continue
@@ -230,34 +362,21 @@ def run_massive_pipeline():
                     continue
 
                 # --- B. Send to Gemini for Scoring ---
-                evaluation = evaluate_restaurant(restaurant_name, scraped_texts, master_target)
-
-                # --- C. Live Save to Staging Queue ---
-                if evaluation:
-                    score = evaluation.get('score', 0)
-                    print(f"🎯 AI Scored {restaurant_name}: {score}/100")
-
-                    row = {
-                        "Neighborhood": neighborhood,
-                        # FIX 2: Save it under the master_target so your lists stay clean!
-                        "Keyword": master_target,
-                        "Restaurant Name": restaurant_name,
-                        "Score": score,
-                        "Award Level": evaluation.get('award_level', 'None'),
-                        "AI Justification": evaluation.get('justification', ''),
-                        "English Desc": evaluation.get('description_en', ''),
-                        "Korean Desc": evaluation.get('description_ko', ''),
-                        "Kakao URL": place.get('place_url', ''),
-                        "Lat": place.get('y', ''),
-                        "Lon": place.get('x', ''),
-                        "Sponsored Ratio": evaluation.get('sponsored_ratio', ''),
-                    }
-
-                    append_to_csv(row)
-                else:
-                    print(f"❌ AI failed to evaluate {restaurant_name}.")
-
-                time.sleep(random.uniform(4.0, 7.0))
+                # Scoring runs in the background so the next restaurant's scrape overlaps it
+                future = evaluator.submit(evaluate_restaurant, restaurant_name, scraped_texts, master_target)
+                pending[future] = (neighborhood, master_target, restaurant_name, place)
+
+                # --- C. Live Save to Staging Queue (whatever has finished so far) ---
+                drain_evaluations(pending)
+
+                # Cooldown only after we actually hit Naver's blog pages; an all-cache restaurant owes it nothing
+                if fetched:
+                    pause(random.uniform(4.0, 7.0), pending)
+
+    # Flush the evaluations still in flight
+    drain_evaluations(pending, wait_all=True)
+    evaluator.shutdown()
+    close_csv()  # The auditor subprocess reads this file next
 
     print(f"\n🏁 Massive Sweep Complete! Data safely secured in {CSV_FILENAME}.")
 
@@ -1,8 +1,13 @@
 import os
+import orjson
+import re
 import requests
 import urllib.parse
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlite_cache import SqliteCache
 
 # Load the keys from your .env file
 # --- FOOLPROOF ENV LOADING ---
@@ -23,6 +28,48 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
+# Search API credentials, resolved once from the loaded environment
+SEARCH_HEADERS = {
+    "X-Naver-Client-Id": CLIENT_ID,
+    "X-Naver-Client-Secret": CLIENT_SECRET
+}
+
+# One keep-alive pool for openapi.naver.com and blog.naver.com (no TLS handshake per request)
+naver_session = requests.Session()
+naver_session.headers.update(HEADERS)
+naver_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=Retry(
+    total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"], respect_retry_after_header=True)))
+
+# Parse only the tags we read: the mainFrame iframe on the wrapper page, the post body on the real page
+MAIN_FRAME_ONLY = SoupStrainer('iframe', id='mainFrame')
+SE_CONTAINER_ONLY = SoupStrainer('div', class_=re.compile(r'\bse-main-container\b'))
+POST_VIEW_ONLY = SoupStrainer('div', id='postViewArea')
+# Class filters for the post body (searched against each class name, like the old substring lambdas)
+TEXT_BLOCK_CLASS = re.compile(r'se-text')
+POST_IMAGE_CLASS = re.compile(r'se-image|se-sticker')
+
+# blog.naver.com/{blogId}/{logNo} links map straight onto the mainFrame iframe's PostView page
+BLOG_POST_RE = re.compile(r'https?://(?:m\.)?blog\.naver\.com/(?P<blog_id>[\w-]+)/(?P<log_no>\d+)')
+POST_VIEW_URL = ("https://blog.naver.com/PostView.naver?blogId={blog_id}&logNo={log_no}"
+                 "&redirect=Dlog&widgetTypeCall=true&directAccess=false")
+
+# Scraped posts survive restarts here (blog URL -> text + bottom images); posts rarely change once published
+BLOG_CACHE_PATH = os.path.join(script_dir, 'data', 'cache', 'naver_blogs.sqlite')
+BLOG_CACHE_TTL = 30 * 24 * 60 * 60
+
+
+blog_cache = SqliteCache(BLOG_CACHE_PATH, ttl=BLOG_CACHE_TTL)
+
+
+def load_cached_blog(blog_url):
+    """Returns a previously scraped post (same shape as scrape_naver_blog_text), or None."""
+    return blog_cache.get(blog_url)
+
+
+def save_cached_blog(blog_url, post):
+    blog_cache.set(blog_url, post)
+
 
 def search_naver_blogs(restaurant_name, neighborhood):
     url = "https://openapi.naver.com/v1/search/blog.json"
@@ -33,16 +80,10 @@ def search_naver_blogs(restaurant_name, neighborhood):
         "sort": "sim"
     }
 
-    # 2. Pull the actual keys from the loaded environment
-    headers = {
-        "X-Naver-Client-Id": os.getenv("NAVER_CLIENT_ID"),
-        "X-Naver-Client-Secret": os.getenv("NAVER_CLIENT_SECRET")
-    }
-
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = naver_session.get(url, headers=SEARCH_HEADERS, params=params, timeout=10)
         response.raise_for_status()
-        return response.json().get('items', [])
+        return orjson.loads(response.content).get('items', [])
 
     except (requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout):
         print(f"⚠️  TIMEOUT: Naver ignored '{restaurant_name}'. Skipping...")
@@ -50,6 +91,22 @@ def search_naver_blogs(restaurant_name, neighborhood):
     except requests.exceptions.RequestException as e:
         print(f"❌  ERROR: Naver API failed for '{restaurant_name}': {e}")
         return []
+    except orjson.JSONDecodeError as e:
+        print(f"❌  ERROR: Naver API returned unreadable JSON for '{restaurant_name}': {e}")
+        return []
+
+
+def find_post_view_url(blog_url):
+    """Fetches a blog's wrapper page and returns the URL of its mainFrame iframe (or None)."""
+    response = naver_session.get(blog_url, timeout=10)
+    if response.status_code != 200:
+        return None
+
+    soup = BeautifulSoup(response.text, 'lxml', parse_only=MAIN_FRAME_ONLY)
+    iframe = soup.find('iframe', id='mainFrame')
+    if not iframe or not iframe.get('src'):
+        return None
+    return f"https://blog.naver.com{iframe['src']}"
 
 
 def scrape_naver_blog_text(blog_url):
@@ -58,44 +115,31 @@ def scrape_naver_blog_text(blog_url):
     to detect sponsorship banners (e.g., '소정의 원고료', '협찬').
     """
     try:
-        # 1. First request to the provided blog URL
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(blog_url, headers=headers, timeout=10)
-        if response.status_code != 200:
+        # 1-2. Naver blogs hide content inside an iframe. Standard post links give its URL away;
+        # anything else needs the wrapper page fetched to read the iframe src.
+        post = BLOG_POST_RE.match(blog_url)
+        real_url = POST_VIEW_URL.format(**post.groupdict()) if post else find_post_view_url(blog_url)
+        if not real_url:
             return None
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # 2. Naver blogs hide content inside an iframe. Find the iframe src.
-        iframe = soup.find('iframe', id='mainFrame')
-        if not iframe:
-            return None
-
-        iframe_src = iframe.get('src')
-        if not iframe_src:
-            return None
-
-        # 3. Construct the real URL and fetch the actual content
-        real_url = f"https://blog.naver.com{iframe_src}"
-        real_response = requests.get(real_url, headers=headers, timeout=10)
+        # 3. Fetch the actual content
+        real_response = naver_session.get(real_url, timeout=10)
         if real_response.status_code != 200:
             return None
 
-        real_soup = BeautifulSoup(real_response.text, 'html.parser')
-
         # 4. Target ONLY the main content area (avoids sidebars/footers)
-        content_area = real_soup.find('div', class_='se-main-container')
+        content_area = BeautifulSoup(real_response.text, 'lxml', parse_only=SE_CONTAINER_ONLY).find(
+            'div', class_='se-main-container')
         if not content_area:
             # Fallback for older Naver blog formats
-            content_area = real_soup.find('div', id='postViewArea')
+            content_area = BeautifulSoup(real_response.text, 'lxml', parse_only=POST_VIEW_ONLY).find(
+                'div', id='postViewArea')
             if not content_area:
                 return None
 
         # 5. Extract Text
         # Get all text blocks and join them cleanly
-        text_blocks = content_area.find_all(['p', 'span', 'div'], class_=lambda c: c and 'se-text' in c)
+        text_blocks = content_area.find_all(['p', 'span', 'div'], class_=TEXT_BLOCK_CLASS)
         if text_blocks:
             final_text = "\n".join([block.get_text(strip=True) for block in text_blocks if block.get_text(strip=True)])
         else:
@@ -106,15 +150,17 @@ def scrape_naver_blog_text(blog_url):
         last_images = []
 
         # Find all legitimate post images within the content container
-        images = content_area.find_all('img', class_=lambda c: c and ('se-image' in c or 'se-sticker' in c))
+        images = content_area.find_all('img', class_=POST_IMAGE_CLASS)
 
         # Grab the last 2 images to ensure we don't miss a banner followed by a map
         for img in images[-2:]:
             if 'src' in img.attrs:
                 last_images.append(img['src'])
 
-        # 7. Return both the text and the image array
-        return {"text": final_text, "bottom_images": last_images}
+        # 7. Return both the text and the image array (and remember it for the next run)
+        post = {"text": final_text, "bottom_images": last_images}
+        save_cached_blog(blog_url, post)
+        return post
 
     except Exception as e:
         print(f"⚠️ Error scraping Naver blog {blog_url}: {e}")
@@ -124,9 +170,10 @@ def scrape_naver_blog_text(blog_url):
 # --- TEST THE FULL PIPELINE ---
 if __name__ == "__main__":
     target_restaurant = "교촌치킨 강남역점"
+    target_neighborhood = "역삼동"
 
     # 1. Get the URLs
-    blog_results = search_naver_blogs(target_restaurant)
+    blog_results = search_naver_blogs(target_restaurant, target_neighborhood)
 
     if blog_results:
         # We will just test the very first blog post to keep it quick
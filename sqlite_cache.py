@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import orjson
+
+
+class SqliteCache:
+    """
+    Small persistent key -> JSON cache used by the agents (Kakao categories, discovery sweeps,
+    scraped Naver posts). Each call opens a short-lived connection and closes it again, so the
+    cache is safe to share between the evaluator threads. `ttl` (seconds) expires entries; None keeps them.
+    """
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, fetched_at REAL, payload BLOB)")
+        return conn
+
+    def get(self, key):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT fetched_at, payload FROM cache WHERE key = ?", (key,)).fetchone()
+        if row and (self.ttl is None or time.time() - row[0] < self.ttl):
+            return orjson.loads(row[1])
+        return None
+
+    def set(self, key, value):
+        # A single-statement transaction, so a crash never leaves a half-written entry
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, fetched_at, payload) VALUES (?, ?, ?)",
+                         (key, time.time(), orjson.dumps(value)))